@@ -1,15 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import ORJSONResponse
+from typing import Dict, Any, List, Optional, Type
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime, timedelta
 import time
 
-from app.core.security import get_current_active_user
-from app.db.models.user import User
-from app.services.blockchain import BlockchainService
-
-# 引入區塊鏈服務
-blockchain_service = BlockchainService()
+from app.core.security import get_current_wallet
+from app.services.blockchain import BlockchainService, get_blockchain_service
 
 # 創建 API 路由器
 api_router = APIRouter()
@@ -31,8 +28,7 @@ class PropertyResponse(PropertyBase):
     available: bool
     metadata: Optional[Dict[str, Any]] = None
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class RentalBase(BaseModel):
     propertyId: int
@@ -51,8 +47,7 @@ class RentalResponse(RentalBase):
     state: int
     allowTransfer: bool
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class PriceCalculation(BaseModel):
     basePrice: float
@@ -67,9 +62,15 @@ class TransactionResponse(BaseModel):
     transaction: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
 
+def trusted_list(items: List[Dict[str, Any]], model: Type[BaseModel]) -> ORJSONResponse:
+    """列表數據來自區塊鏈服務，格式可信：直接返回響應以跳過逐項 Pydantic 驗證；
+    只保留響應模型中定義且數據中存在的字段，等同 exclude_unset (response_model 僅用於生成 API 文檔)"""
+    fields = model.model_fields.keys()
+    return ORJSONResponse([{k: item[k] for k in fields if k in item} for item in items])
+
 # API 端點
 
-@api_router.get("/properties/", response_model=List[PropertyResponse])
+@api_router.get("/properties/", response_model=list[PropertyResponse])
 async def get_properties(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
@@ -77,27 +78,26 @@ async def get_properties(
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     min_duration: Optional[int] = None,
-    max_duration: Optional[int] = None
+    max_duration: Optional[int] = None,
+    blockchain_service: BlockchainService = Depends(get_blockchain_service),
 ):
     """獲取可用物業列表"""
-    properties = await blockchain_service.get_available_properties(skip, limit)
-    
-    # 應用過濾條件
-    if location:
-        properties = [p for p in properties if location.lower() in p["location"].lower()]
-    if min_price is not None:
-        properties = [p for p in properties if float(p["pricePerMonth"]) >= min_price]
-    if max_price is not None:
-        properties = [p for p in properties if float(p["pricePerMonth"]) <= max_price]
-    if min_duration is not None:
-        properties = [p for p in properties if p["minRentalDuration"] >= min_duration]
-    if max_duration is not None:
-        properties = [p for p in properties if p["maxRentalDuration"] <= max_duration]
-    
-    return properties
+    properties = await blockchain_service.get_available_properties(
+        skip,
+        limit,
+        location=location,
+        min_price=min_price,
+        max_price=max_price,
+        min_duration=min_duration,
+        max_duration=max_duration,
+    )
+    return trusted_list(properties, PropertyResponse)
 
 @api_router.get("/properties/{property_id}", response_model=PropertyResponse)
-async def get_property(property_id: int):
+async def get_property(
+    property_id: int,
+    blockchain_service: BlockchainService = Depends(get_blockchain_service),
+):
     """獲取特定物業詳情"""
     property_data = await blockchain_service.get_property(property_id)
     if not property_data:
@@ -107,19 +107,14 @@ async def get_property(property_id: int):
 @api_router.post("/properties/", response_model=TransactionResponse)
 async def create_property(
     property_data: PropertyCreate,
-    current_user: User = Depends(get_current_active_user)
+    wallet_address: str = Depends(get_current_wallet),
+    blockchain_service: BlockchainService = Depends(get_blockchain_service),
 ):
     """建立新物業 (需要登入)"""
-    if not current_user.wallet_address:
-        raise HTTPException(status_code=400, detail="Wallet address not set")
-    
-    # 更新用戶為房東
-    current_user.is_landlord = True
-    
     # 將物業添加到區塊鏈
     result = await blockchain_service.list_property(
-        current_user.wallet_address,
-        property_data.dict(),
+        wallet_address,
+        property_data.model_dump(),
         None  # 不提供私鑰，用戶需要自己簽名交易
     )
     
@@ -128,33 +123,27 @@ async def create_property(
     
     return result
 
-@api_router.get("/rentals/", response_model=List[RentalResponse])
-async def get_user_rentals(current_user: User = Depends(get_current_active_user)):
+@api_router.get("/rentals/", response_model=list[RentalResponse])
+async def get_user_rentals(
+    wallet_address: str = Depends(get_current_wallet),
+    blockchain_service: BlockchainService = Depends(get_blockchain_service),
+):
     """獲取當前用戶的租約 (需要登入)"""
-    if not current_user.wallet_address:
-        raise HTTPException(status_code=400, detail="Wallet address not set")
-    
-    rentals = await blockchain_service.get_user_rentals(current_user.wallet_address)
-    return rentals
+    rentals = await blockchain_service.get_user_rentals(wallet_address)
+    return trusted_list(rentals, RentalResponse)
 
-@api_router.get("/rentals/{rental_id}", response_model=RentalResponse)
-async def get_rental(rental_id: int):
-    """獲取特定租約詳情"""
-    rental = await blockchain_service.get_rental(rental_id)
-    if not rental:
-        raise HTTPException(status_code=404, detail="Rental not found")
-    return rental
-
-@api_router.post("/rentals/calculate", response_model=PriceCalculation)
+# 必須註冊在 /rentals/{rental_id} 之前，否則 "calculate" 會被當作租約ID匹配
+@api_router.get("/rentals/calculate", response_model=PriceCalculation)
 async def calculate_rental_price(
-    property_id: int = Body(...),
-    start_date: int = Body(...),  # Unix timestamp
-    end_date: int = Body(...),    # Unix timestamp
+    response: Response,
+    property_id: int = Query(...),
+    start_date: int = Query(...),  # Unix timestamp
+    end_date: int = Query(...),    # Unix timestamp
+    blockchain_service: BlockchainService = Depends(get_blockchain_service),
 ):
-    """計算租約價格"""
+    """計算租約價格 (GET 請求，可由 CDN/反向代理快取)"""
     # 計算提前預訂天數
-    now = int(time.time())
-    advance_booking_days = (start_date - now) // 86400  # 一天的秒數
+    advance_booking_days = (start_date - time.time_ns() // 1_000_000_000) // 86400  # 一天的秒數
     
     price_calc = await blockchain_service.calculate_rental_price(
         property_id, start_date, end_date, advance_booking_days
@@ -163,13 +152,25 @@ async def calculate_rental_price(
     if not price_calc:
         raise HTTPException(status_code=400, detail="Failed to calculate price")
     
+    response.headers["Cache-Control"] = "public, max-age=60"
     return price_calc
 
-@api_router.get("/landlord/properties/", response_model=List[PropertyResponse])
-async def get_landlord_properties(current_user: User = Depends(get_current_active_user)):
+@api_router.get("/rentals/{rental_id}", response_model=RentalResponse)
+async def get_rental(
+    rental_id: int,
+    blockchain_service: BlockchainService = Depends(get_blockchain_service),
+):
+    """獲取特定租約詳情"""
+    rental = await blockchain_service.get_rental(rental_id)
+    if not rental:
+        raise HTTPException(status_code=404, detail="Rental not found")
+    return rental
+
+@api_router.get("/landlord/properties/", response_model=list[PropertyResponse])
+async def get_landlord_properties(
+    wallet_address: str = Depends(get_current_wallet),
+    blockchain_service: BlockchainService = Depends(get_blockchain_service),
+):
     """獲取當前房東的物業 (需要登入)"""
-    if not current_user.wallet_address:
-        raise HTTPException(status_code=400, detail="Wallet address not set")
-    
-    properties = await blockchain_service.get_landlord_properties(current_user.wallet_address)
-    return properties
\ No newline at end of file
+    properties = await blockchain_service.get_landlord_properties(wallet_address)
+    return trusted_list(properties, PropertyResponse)
\ No newline at end of file
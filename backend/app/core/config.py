@@ -1,5 +1,6 @@
 import os
-from pydantic import BaseSettings
+from dataclasses import make_dataclass
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from typing import Optional, Dict, Any, List
 
 class Settings(BaseSettings):
@@ -13,8 +14,11 @@ class Settings(BaseSettings):
     
     # 數據庫配置
     DATABASE_URL: str = os.getenv(
-        "DATABASE_URL", "sqlite:///./debook.db"
+        "DATABASE_URL", "sqlite+aiosqlite:///./debook.db"
     )
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "20"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "40"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # 秒
     
     # 區塊鏈配置
     BLOCKCHAIN_PROVIDER: str = os.getenv("BLOCKCHAIN_PROVIDER", "https://polygon-mumbai.infura.io/v3/your-infura-id")
@@ -23,22 +27,42 @@ class Settings(BaseSettings):
     ESCROW_ADDRESS: str = os.getenv("ESCROW_ADDRESS", "0x789...")
     GOVERNANCE_ADDRESS: str = os.getenv("GOVERNANCE_ADDRESS", "0xabc...")
     STABLECOIN_ADDRESS: str = os.getenv("STABLECOIN_ADDRESS", "0xdef...")
+    CHAIN_ID: int = int(os.getenv("CHAIN_ID", "0"))  # 固定鏈ID，避免向節點查詢；0 表示首次發送交易時查詢一次
+    WEB3_POOL_CONNECTIONS: int = int(os.getenv("WEB3_POOL_CONNECTIONS", "32"))
+    WEB3_POOL_MAXSIZE: int = int(os.getenv("WEB3_POOL_MAXSIZE", "64"))
+    WEB3_REQUEST_TIMEOUT: int = int(os.getenv("WEB3_REQUEST_TIMEOUT", "10"))  # 秒
+    # Multicall3 合約地址 (各主要網絡的部署地址相同)，設為空字符串則停用
+    MULTICALL3_ADDRESS: str = os.getenv("MULTICALL3_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11")
+    MULTICALL3_BATCH_SIZE: int = int(os.getenv("MULTICALL3_BATCH_SIZE", "100"))  # 每次 aggregate3 的最大調用數
+    RPC_BATCH_REQUESTS: bool = os.getenv("RPC_BATCH_REQUESTS", "true").lower() == "true"  # 按內部調用計費的提供商可關閉
+    RPC_BATCH_SIZE: int = int(os.getenv("RPC_BATCH_SIZE", "25"))  # 每個 JSON-RPC 批量請求的最大調用數
+    RPC_CONCURRENCY: int = int(os.getenv("RPC_CONCURRENCY", "50"))  # 同時進行的合約讀取上限
+    READ_CACHE_TTL: int = int(os.getenv("READ_CACHE_TTL", "12"))  # 物業/租約讀取快取秒數 (約一個區塊)
     
     # IPFS 配置
     IPFS_GATEWAY: str = os.getenv("IPFS_GATEWAY", "https://ipfs.io/ipfs/")
     IPFS_API: str = os.getenv("IPFS_API", "https://ipfs.infura.io:5001/api/v0")
     IPFS_PROJECT_ID: Optional[str] = os.getenv("IPFS_PROJECT_ID")
     IPFS_PROJECT_SECRET: Optional[str] = os.getenv("IPFS_PROJECT_SECRET")
+    IPFS_REQUEST_TIMEOUT: int = int(os.getenv("IPFS_REQUEST_TIMEOUT", "10"))  # 秒
     
     # 其他配置
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     DEFAULT_PAGINATION_LIMIT: int = 20
     MAX_PAGINATION_LIMIT: int = 100
     
     # CORS 配置
     CORS_ORIGINS: List[str] = ["*"]
     
-    class Config:
-        env_file = ".env"
-        case_sensitive = True
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
+
+# 熱路徑 (如 JWT 編碼/解碼) 使用的唯讀設定副本：凍結且使用 __slots__ 的 dataclass
+FastSettings = make_dataclass(
+    "FastSettings",
+    [(name, field.annotation) for name, field in Settings.model_fields.items()],
+    frozen=True,
+    slots=True,
+)
+settings_fast = FastSettings(**settings.model_dump())
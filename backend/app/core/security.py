@@ -1,17 +1,32 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from typing import Optional
+from jose.exceptions import ExpiredSignatureError
+from cachetools import TTLCache
+from sqlalchemy.orm import make_transient_to_detached
+from typing import Any, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 from pydantic import BaseModel
+import time
 
-from app.core.config import settings
+from app.core.config import settings_fast
 from app.db.session import get_db
 from app.db.models.user import User
 
 # OAuth2 密碼流
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
 
+# 令牌解碼快取：token -> (username, exp)，避免重複 HMAC 驗證與 JSON 解析
+_token_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+
+# 用戶快取：username -> 欄位值快照 (不快取綁定在請求會話上的 ORM 實例)，避免每個請求都查詢數據庫
+_user_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+
+# 每個用戶的快取版本，失效時遞增；查詢期間版本改變則不寫入快取，避免覆蓋為舊數據
+_user_versions: Dict[str, int] = {}
+
+_USER_FIELDS = tuple(attr.key for attr in User.__mapper__.column_attrs)
+
 # Token 數據模型
 class TokenData(BaseModel):
     username: Optional[str] = None
@@ -26,34 +41,96 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + timedelta(minutes=15)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, settings_fast.SECRET_KEY, algorithm=settings_fast.ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(get_db)):
-    """獲取當前用戶"""
-    credentials_exception = HTTPException(
+def decode_access_token(token: str) -> Tuple[str, int]:
+    """解碼訪問令牌，返回 (username, exp)"""
+    cached = _token_cache.get(token)
+    if cached is None:
+        payload = jwt.decode(token, settings_fast.SECRET_KEY, algorithms=[settings_fast.ALGORITHM])
+        username = payload.get("sub")
+        if username is None:
+            raise JWTError("Token has no subject")
+        cached = (username, payload["exp"])
+        _token_cache[token] = cached
+    
+    # 快取命中時仍需檢查令牌是否過期
+    if cached[1] <= time.time():
+        _token_cache.pop(token, None)
+        raise ExpiredSignatureError("Signature has expired")
+    return cached
+
+def invalidate_user_cache(username: str):
+    """移除快取中的用戶 (用戶數據更新後調用)"""
+    _user_versions[username] = _user_versions.get(username, 0) + 1
+    _user_cache.pop(username, None)
+
+def _user_snapshot(user: User) -> Dict[str, Any]:
+    return {field: getattr(user, field) for field in _USER_FIELDS}
+
+def _user_from_snapshot(snapshot: Dict[str, Any]) -> User:
+    """從快照重建已持久化狀態的用戶實例 (可用 merge(load=False) 關聯到會話)"""
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db = Depends(get_db)):
+    """獲取當前用戶"""
+    credentials_exception = _credentials_exception()
     
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
+        username, _ = decode_access_token(token)
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
     
-    user = User.get_by_username(db, token_data.username)
+    snapshot = _user_cache.get(token_data.username)
+    if snapshot is not None:
+        # 將快取的用戶關聯到當前會話，無需再次查詢
+        return await db.merge(_user_from_snapshot(snapshot), load=False)
+    
+    version = _user_versions.get(token_data.username, 0)
+    user = await User.get_by_username(db, token_data.username)
     if user is None:
         raise credentials_exception
     
+    # 查詢期間用戶被更新 (快取已失效) 時不寫入，下次請求重新查詢
+    if _user_versions.get(token_data.username, 0) == version:
+        _user_cache[token_data.username] = _user_snapshot(user)
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
     """獲取當前活躍用戶"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_current_wallet(token: str = Depends(oauth2_scheme), db = Depends(get_db)) -> str:
+    """獲取當前活躍用戶的錢包地址 (只讀取所需欄位，不加載完整用戶)"""
+    try:
+        username, _ = decode_access_token(token)
+    except JWTError:
+        raise _credentials_exception()
+    
+    snapshot = _user_cache.get(username)
+    if snapshot is not None:
+        is_active, wallet_address = snapshot["is_active"], snapshot["wallet_address"]
+    else:
+        user = await User.get_wallet_status(db, username)
+        if user is None:
+            raise _credentials_exception()
+        is_active, wallet_address = user.is_active, user.wallet_address
+    
+    if not is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    if not wallet_address:
+        raise HTTPException(status_code=400, detail="Wallet address not set")
+    return wallet_address
@@ -1,18 +1,36 @@
-from sqlalchemy import Boolean, Column, Integer, String, DateTime
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Index, bindparam, select, text, update
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 from sqlalchemy.sql import func
 from passlib.context import CryptContext
 from typing import Optional
+import asyncio
 import uuid
 
+from app.core.config import settings
 from app.db.session import Base
 
-# 密碼加密工具
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 密碼加密工具 (argon2id 為預設，保留 bcrypt 以驗證舊密碼)
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    default="argon2",
+    deprecated="auto",
+    argon2__time_cost=2,
+    argon2__memory_cost=19456,
+    argon2__parallelism=1,
+)
+
+def _id_column() -> Column:
+    """主鍵欄位：Postgres 由數據庫生成並以 16 字節 UUID 存儲，其他數據庫在 Python 端生成"""
+    if settings.DATABASE_URL.startswith("postgres"):
+        # gen_random_uuid() 為 PostgreSQL 13+ 內建函數
+        return Column(PG_UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
+    return Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
 
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(String, primary_key=True, index=True, default=lambda: str(uuid.uuid4()))
+    id = _id_column()
     username = Column(String, unique=True, index=True)
     email = Column(String, unique=True, index=True)
     hashed_password = Column(String)
@@ -22,25 +40,46 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (
+        # 部分索引：只索引已綁定錢包的用戶，加速 get_by_wallet
+        Index(
+            "ix_users_wallet_address",
+            wallet_address,
+            postgresql_where=wallet_address.isnot(None),
+            sqlite_where=wallet_address.isnot(None),
+        ),
+    )
+    
     @staticmethod
-    def get_by_username(db, username: str):
+    async def get_by_username(db, username: str):
         """通過用戶名獲取用戶"""
-        return db.query(User).filter(User.username == username).first()
+        result = await db.execute(_USERNAME_STMT, {"username": username})
+        return result.scalar_one_or_none()
     
     @staticmethod
-    def get_by_email(db, email: str):
+    async def get_by_email(db, email: str):
         """通過郵箱獲取用戶"""
-        return db.query(User).filter(User.email == email).first()
+        result = await db.execute(_EMAIL_STMT, {"email": email})
+        return result.scalar_one_or_none()
     
     @staticmethod
-    def get_by_wallet(db, wallet_address: str):
+    async def get_by_wallet(db, wallet_address: str):
         """通過錢包地址獲取用戶"""
-        return db.query(User).filter(User.wallet_address == wallet_address).first()
+        result = await db.execute(_WALLET_STMT, {"wallet_address": wallet_address})
+        return result.scalars().first()
+    
+    @staticmethod
+    async def get_wallet_status(db, username: str):
+        """只查詢錢包地址與啟用狀態 (不加載完整用戶對象)"""
+        result = await db.execute(_WALLET_STATUS_STMT, {"username": username})
+        return result.one_or_none()
     
     @staticmethod
-    def create(db, user_data):
-        """創建新用戶"""
-        hashed_password = pwd_context.hash(user_data.password)
+    async def create(db, user_data):
+        """創建新用戶 (用戶名或郵箱重複時拋出 IntegrityError)"""
+        # 密碼雜湊為 CPU 密集操作，放到線程池執行以免阻塞事件循環
+        loop = asyncio.get_running_loop()
+        hashed_password = await loop.run_in_executor(None, pwd_context.hash, user_data.password)
         db_user = User(
             username=user_data.username,
             email=user_data.email,
@@ -48,31 +87,38 @@ class User(Base):
             wallet_address=user_data.wallet_address,
         )
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         return db_user
     
     @staticmethod
-    def authenticate(db, username: str, password: str):
+    async def authenticate(db, username: str, password: str):
         """驗證用戶"""
-        user = User.get_by_username(db, username)
+        user = await User.get_by_username(db, username)
         if not user:
             return None
         if not user.is_active:
             return None
-        if not pwd_context.verify(password, user.hashed_password):
+        loop = asyncio.get_running_loop()
+        if not await loop.run_in_executor(None, pwd_context.verify, password, user.hashed_password):
             return None
         return user
     
-    def update_wallet(self, db, wallet_address: str):
-        """更新錢包地址"""
-        self.wallet_address = wallet_address
-        db.commit()
-        db.refresh(self)
+    async def update_wallet(self, db, wallet_address: str):
+        """更新錢包地址 (單條 UPDATE ... RETURNING，提交後無需再查詢)"""
+        result = await db.execute(
+            _UPDATE_WALLET_STMT, {"user_id": self.id, "new_wallet_address": wallet_address}
+        )
+        updated_at = result.scalar_one()
+        await db.commit()
+        
+        # 直接寫回實例，不標記為待更新
+        set_committed_value(self, "wallet_address", wallet_address)
+        set_committed_value(self, "updated_at", updated_at)
         return self
     
     def to_dict(self):
-        """轉換為字典"""
+        """轉換為字典 (日期時間由 ORJSONResponse 直接序列化)"""
         return {
             "id": self.id,
             "username": self.username,
@@ -80,6 +126,19 @@ class User(Base):
             "wallet_address": self.wallet_address,
             "is_active": self.is_active,
             "is_landlord": self.is_landlord,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
-        }
\ No newline at end of file
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+# 預先構建的查詢語句，重複使用以命中 SQLAlchemy 的編譯快取
+_USERNAME_STMT = select(User).where(User.username == bindparam("username"))
+_EMAIL_STMT = select(User).where(User.email == bindparam("email"))
+_WALLET_STMT = select(User).where(User.wallet_address == bindparam("wallet_address")).limit(1)
+_WALLET_STATUS_STMT = select(User.wallet_address, User.is_active).where(User.username == bindparam("username"))
+_UPDATE_WALLET_STMT = (
+    update(User)
+    .where(User.id == bindparam("user_id"))
+    .values(wallet_address=bindparam("new_wallet_address"), updated_at=func.now())
+    .returning(User.updated_at)
+    .execution_options(synchronize_session=False)
+)
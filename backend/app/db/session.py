@@ -1,33 +1,42 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import StaticPool
 
 from app.core.config import settings
 
-# 創建 SQLAlchemy 引擎
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
-)
+# 連接池配置
+if settings.DATABASE_URL.startswith("sqlite"):
+    engine_options = {}
+    if ":memory:" in settings.DATABASE_URL or settings.DATABASE_URL.endswith("://"):
+        # 內存數據庫必須共用同一個連接，否則每個連接都是獨立的空數據庫
+        engine_options["poolclass"] = StaticPool
+else:
+    engine_options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_pre_ping": True,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
 
-# 創建會話類
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 創建 SQLAlchemy 異步引擎 (postgresql+asyncpg / sqlite+aiosqlite)
+engine = create_async_engine(settings.DATABASE_URL, **engine_options)
+
+# 創建會話類 (提交後不過期，避免在異步環境中觸發隱式延遲加載)
+SessionLocal = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
 
 # 創建 Base 類
 Base = declarative_base()
 
 # 依賴項，獲取數據庫會話
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 # 初始化數據庫
-def init_db():
+async def init_db():
     # 導入所有模型
     from app.db.models import user
     
     # 創建所有表
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
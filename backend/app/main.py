@@ -1,29 +1,50 @@
 from fastapi import FastAPI, HTTPException, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import uvicorn
 from datetime import datetime, timedelta
 import os
+import logging
+import logging.handlers
+import queue
 from dotenv import load_dotenv
+from sqlalchemy.exc import IntegrityError
 
 # 引入自定義模組
 from app.api.v1.router import api_router
 from app.core.config import settings
 from app.db.session import get_db
-from app.core.security import create_access_token, get_current_active_user
+from app.core.security import create_access_token, get_current_active_user, invalidate_user_cache
 from app.db.models.user import User
-from app.services.blockchain import BlockchainService
+from app.services.blockchain import close_blockchain_service, start_blockchain_service
 
 # 載入環境變量
 load_dotenv()
 
+def setup_logging() -> logging.handlers.QueueListener:
+    """日誌先寫入隊列，由後台線程輸出，避免在事件循環中阻塞寫入"""
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+    
+    root = logging.getLogger()
+    root.setLevel(settings.LOG_LEVEL)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener.start()
+    return listener
+
+log_listener = setup_logging()
+
 app = FastAPI(
     title="DeBooK API",
     description="DeBooK 長期租賃區塊鏈平台 API",
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    default_response_class=ORJSONResponse,
 )
 
 # 設定 CORS
@@ -38,6 +59,18 @@ app.add_middleware(
 # 包含 API 路由
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+@app.on_event("startup")
+async def startup():
+    # 在事件循環中創建區塊鏈服務，RPC 與 IPFS 請求共用同一個 HTTP 連接池
+    await start_blockchain_service()
+
+@app.on_event("shutdown")
+async def shutdown():
+    # 關閉區塊鏈服務持有的 HTTP 連接池
+    await close_blockchain_service()
+    # 輸出隊列中剩餘的日誌
+    log_listener.stop()
+
 # 認證相關模型
 class Token(BaseModel):
     access_token: str
@@ -56,16 +89,13 @@ class UserLogin(BaseModel):
     username: str
     password: str
 
-# 創建區塊鏈服務實例
-blockchain_service = BlockchainService()
-
 @app.get("/")
 async def root():
     return {"message": "Welcome to DeBooK API", "docs": "/docs"}
 
 @app.post("/token", response_model=Token)
 async def login_for_access_token(form_data: UserLogin, db = Depends(get_db)):
-    user = User.authenticate(db, form_data.username, form_data.password)
+    user = await User.authenticate(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -78,26 +108,45 @@ async def login_for_access_token(form_data: UserLogin, db = Depends(get_db)):
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
+# 用戶名/郵箱唯一索引的名稱 (由 unique=True, index=True 生成)
+_UNIQUE_USER_INDEXES = {"ix_users_username": "username", "ix_users_email": "email"}
+_SQLITE_UNIQUE_PREFIX = "UNIQUE constraint failed: users."
+
+def duplicate_user_field(error: IntegrityError) -> Optional[str]:
+    """按約束名或列名判斷重複的字段 ("username" / "email")，其他完整性錯誤返回 None；
+    不搜索完整錯誤信息，因其中可能包含用戶提交的值"""
+    # asyncpg：驅動原始異常帶有約束名
+    constraint_name = getattr(error.orig.__cause__, "constraint_name", None)
+    if constraint_name:
+        return _UNIQUE_USER_INDEXES.get(constraint_name)
+    # sqlite："UNIQUE constraint failed: users.<列名>"
+    message = str(error.orig)
+    if message.startswith(_SQLITE_UNIQUE_PREFIX):
+        column = message[len(_SQLITE_UNIQUE_PREFIX):]
+        if column in ("username", "email"):
+            return column
+    return None
+
 @app.post("/register", response_model=Token)
 async def register_user(user_data: UserCreate, db = Depends(get_db)):
-    # 檢查用戶名或郵箱是否已存在
-    existing_user = User.get_by_username(db, user_data.username)
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-    
-    existing_email = User.get_by_email(db, user_data.email)
-    if existing_email:
+    # 創建新用戶，由唯一約束檢查用戶名或郵箱是否已存在
+    try:
+        user = await User.create(db, user_data)
+    except IntegrityError as e:
+        await db.rollback()
+        # 只把用戶名/郵箱的唯一約束衝突報告為已註冊，其他約束錯誤照常拋出
+        field = duplicate_user_field(e)
+        if field == "username":
+            detail = "Username already registered"
+        elif field == "email":
+            detail = "Email already registered"
+        else:
+            raise
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
+            detail=detail
         )
     
-    # 創建新用戶
-    user = User.create(db, user_data)
-    
     # 創建訪問令牌
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -122,7 +171,8 @@ async def update_wallet_address(
     current_user: User = Depends(get_current_active_user),
     db = Depends(get_db)
 ):
-    current_user.update_wallet(db, wallet_address)
+    await current_user.update_wallet(db, wallet_address)
+    invalidate_user_cache(current_user.username)
     return {"status": "success", "wallet_address": wallet_address}
 
 if __name__ == "__main__":
@@ -1,76 +1,246 @@
-import json
+import asyncio
+import logging
 import time
-from typing import Dict, Any, List, Optional, Tuple
-from web3 import Web3
-from web3.middleware import geth_poa_middleware
+from functools import lru_cache
+from typing import Callable, Dict, Any, List, NamedTuple, Optional, Tuple
+from web3 import AsyncWeb3, AsyncHTTPProvider
+from web3._utils.abi import get_abi_input_types, get_abi_output_types, map_abi_data
+from web3._utils.events import get_event_data
+from web3._utils.normalizers import BASE_RETURN_NORMALIZERS
+from eth_utils import event_abi_to_log_topic, function_abi_to_4byte_selector
+from web3.exceptions import BadFunctionCallOutput
+from web3.middleware import async_geth_poa_middleware
+from hexbytes import HexBytes
 from eth_account import Account
 from eth_account.signers.local import LocalAccount
 import os
+import aiohttp
+import orjson
 import ipfshttpclient
-import requests
+from cachetools import LRUCache, TTLCache
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+# 1 ether = 10**18 wei (金額以 float 輸出，與響應模型一致)
+_WEI = 10**18
+
+# 交易 gas 限制為估算值的倍數，留出狀態變化的餘量
+_GAS_LIMIT_MULTIPLIER = 1.2
+
+# 分頁讀取物業時，每個窗口讀取的數量為 limit 的倍數
+_OVERFETCH_FACTOR = 2
+
+# Multicall3 aggregate3 的最小 ABI
+_MULTICALL3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"},
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]",
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"},
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]",
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function",
+    }
+]
+
+# 合約 ABI 文件
+_CONTRACT_FILES = {
+    "RentalNFT": "RentalNFT.json",
+    "DeFiIntegration": "DeFiIntegration.json",
+    "Escrow": "Escrow.json",
+    "Governance": "Governance.json"
+}
+
+@lru_cache(maxsize=None)
+def _load_abi(name: str) -> List[Dict[str, Any]]:
+    """載入智能合約 ABI (每個合約只解析一次)"""
+    # 假設 ABI 文件位於 contracts 目錄中
+    path = os.path.join(os.path.dirname(__file__), f"../../contracts/{_CONTRACT_FILES[name]}")
+    try:
+        with open(path, "rb") as file:
+            return orjson.loads(file.read())["abi"]
+    except Exception:
+        logger.exception("Error loading ABI for %s", name)
+        # 使用空 ABI 防止程序崩潰
+        return []
+
+@lru_cache(maxsize=None)
+def _function_codec(name: str, fn_name: str) -> Tuple[bytes, Tuple[str, ...], Tuple[str, ...]]:
+    """預先計算合約函數的選擇器及輸入/輸出類型 (每個函數只解析一次)"""
+    fn_abi = next(
+        (item for item in _load_abi(name) if item.get("type") == "function" and item.get("name") == fn_name),
+        None,
+    )
+    if fn_abi is None:
+        raise ValueError(f"Function {fn_name} not found in {name} ABI")
+    return (
+        function_abi_to_4byte_selector(fn_abi),
+        tuple(get_abi_input_types(fn_abi)),
+        tuple(get_abi_output_types(fn_abi)),
+    )
+
+class _EncodedCall(NamedTuple):
+    """已編碼的合約讀取調用"""
+    address: str
+    fn_name: str
+    data: bytes
+    output_types: Tuple[str, ...]
+
+@lru_cache(maxsize=1)
+def _get_web3() -> AsyncWeb3:
+    """全局共用的異步 Web3 連接 (首次使用時創建)"""
+    web3 = AsyncWeb3(AsyncHTTPProvider(
+        settings.BLOCKCHAIN_PROVIDER,
+        request_kwargs={"timeout": aiohttp.ClientTimeout(total=settings.WEB3_REQUEST_TIMEOUT)},
+    ))
+    web3.middleware_onion.inject(async_geth_poa_middleware, layer=0)
+    return web3
+
+@lru_cache(maxsize=None)
+def _get_contract(name: str, address: str):
+    """全局共用的合約實例 (每個合約只創建一次)"""
+    return _get_web3().eth.contract(address=address, abi=_load_abi(name))
+
 class BlockchainService:
     """區塊鏈服務類：處理與智能合約的交互"""
     
+    # 固定實例屬性佈局 (無 __dict__，屬性訪問更快、佔用更少)
+    __slots__ = (
+        "web3",
+        "admin_account",
+        "ipfs_client",
+        "_ipfs_ready",
+        "_ipfs_lock",
+        "_rental_nft",
+        "_defi_integration",
+        "_escrow",
+        "_governance",
+        "_multicall3",
+        "_multicall3_missing",
+        "_multicall3_failed_before",
+        "_property_listed",
+        "_price_cache",
+        "_price_tasks",
+        "_property_cache",
+        "_rental_cache",
+        "_property_count_cache",
+        "_metadata_cache",
+        "_http_client",
+        "_sem",
+        "_fee_cache",
+        "_chain_id",
+        "_nonces",
+        "_nonce_mutex",
+    )
+    
     def __init__(self):
         # 初始化Web3連接
-        self.web3 = Web3(Web3.HTTPProvider(settings.BLOCKCHAIN_PROVIDER))
-        self.web3.middleware_onion.inject(geth_poa_middleware, layer=0)
+        self.web3 = _get_web3()
         
-        # 載入合約ABI
-        self._load_contract_abis()
+        # 合約實例在首次使用時才從模塊級快取中綁定 (見下方同名屬性)
+        self._rental_nft = None
+        self._defi_integration = None
+        self._escrow = None
+        self._governance = None
+        self._multicall3 = None
+        # Multicall3 未部署在配置地址時停用 (如本地開發鏈)；瞬時錯誤只記錄一次完整堆棧
+        self._multicall3_missing = False
+        self._multicall3_failed_before = False
+        self._property_listed: Optional[Tuple[bytes, Dict[str, Any]]] = None
         
-        # 初始化合約實例
-        self.rental_nft = self.web3.eth.contract(
-            address=settings.RENTAL_NFT_ADDRESS,
-            abi=self.contract_abis["RentalNFT"]
-        )
+        # 後端管理員帳戶 (用於管理操作)
+        self.admin_account: Optional[LocalAccount] = None
+        self._setup_admin_account()
         
-        self.defi_integration = self.web3.eth.contract(
-            address=settings.DEFI_INTEGRATION_ADDRESS,
-            abi=self.contract_abis["DeFiIntegration"]
-        )
+        # IPFS 客戶端在首次上傳時才設置 (見 _get_ipfs_client)
+        self.ipfs_client = None
+        self._ipfs_ready = False
+        self._ipfs_lock: Optional[asyncio.Lock] = None
         
-        self.escrow = self.web3.eth.contract(
-            address=settings.ESCROW_ADDRESS,
-            abi=self.contract_abis["Escrow"]
-        )
+        # 租金計算快取，及每個查詢鍵進行中的查詢任務 (合併相同的並發請求)
+        self._price_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+        self._price_tasks: Dict[Tuple[int, int, int, int], asyncio.Task] = {}
         
-        self.governance = self.web3.eth.contract(
-            address=settings.GOVERNANCE_ADDRESS,
-            abi=self.contract_abis["Governance"]
-        )
+        # 物業與租約讀取快取 (已解析的字典)，狀態變更後最多延遲一個區塊可見
+        self._property_cache: TTLCache = TTLCache(maxsize=10_000, ttl=settings.READ_CACHE_TTL)
+        self._rental_cache: TTLCache = TTLCache(maxsize=10_000, ttl=settings.READ_CACHE_TTL)
         
-        # 後端管理員帳戶 (用於管理操作)
-        self.admin_account: Optional[LocalAccount] = None
-        self._setup_admin_account()
+        # 物業總數快取：總數只增不減，新物業由 list_property 直接更新
+        self._property_count_cache: TTLCache = TTLCache(maxsize=1, ttl=5)
         
-        # 初始化 IPFS 客戶端
-        self._setup_ipfs_client()
-    
-    def _load_contract_abis(self):
-        """載入智能合約 ABI"""
-        self.contract_abis = {}
+        # IPFS 元數據快取：CID 內容尋址，內容不可變，因此無需過期
+        self._metadata_cache: LRUCache = LRUCache(maxsize=10_000)
         
-        contract_files = {
-            "RentalNFT": "RentalNFT.json",
-            "DeFiIntegration": "DeFiIntegration.json",
-            "Escrow": "Escrow.json",
-            "Governance": "Governance.json"
-        }
+        # 共用的異步 HTTP 會話 (首次使用時在事件循環中創建)
+        self._http_client: Optional[aiohttp.ClientSession] = None
         
-        for name, filename in contract_files.items():
-            # 假設 ABI 文件位於 contracts 目錄中
-            path = os.path.join(os.path.dirname(__file__), f"../../contracts/{filename}")
-            try:
-                with open(path, "r") as file:
-                    contract_data = json.load(file)
-                    self.contract_abis[name] = contract_data["abi"]
-            except Exception as e:
-                print(f"Error loading ABI for {name}: {e}")
-                # 使用空 ABI 防止程序崩潰
-                self.contract_abis[name] = []
+        # 限制並發合約讀取數量的信號量 (首次使用時在事件循環中創建)
+        self._sem: Optional[asyncio.Semaphore] = None
+        
+        # 交易參數快取：手續費最多沿用一個區塊，chainId 只查詢一次，
+        # nonce 首次從鏈上同步後在本地遞增 (發送失敗時重新同步)
+        self._fee_cache: TTLCache = TTLCache(maxsize=1, ttl=settings.READ_CACHE_TTL)
+        self._chain_id: Optional[int] = settings.CHAIN_ID or None
+        self._nonces: Dict[str, int] = {}
+        self._nonce_mutex: Optional[asyncio.Lock] = None
+    
+    @property
+    def rental_nft(self):
+        if self._rental_nft is None:
+            self._rental_nft = _get_contract("RentalNFT", settings.RENTAL_NFT_ADDRESS)
+        return self._rental_nft
+    
+    @property
+    def defi_integration(self):
+        if self._defi_integration is None:
+            self._defi_integration = _get_contract("DeFiIntegration", settings.DEFI_INTEGRATION_ADDRESS)
+        return self._defi_integration
+    
+    @property
+    def escrow(self):
+        if self._escrow is None:
+            self._escrow = _get_contract("Escrow", settings.ESCROW_ADDRESS)
+        return self._escrow
+    
+    @property
+    def governance(self):
+        if self._governance is None:
+            self._governance = _get_contract("Governance", settings.GOVERNANCE_ADDRESS)
+        return self._governance
+    
+    @property
+    def _property_listed_event(self) -> Tuple[bytes, Dict[str, Any]]:
+        """PropertyListed 事件的 topic0 及 ABI (只計算一次)"""
+        if self._property_listed is None:
+            abi = self.rental_nft.events.PropertyListed().abi
+            self._property_listed = (event_abi_to_log_topic(abi), abi)
+        return self._property_listed
+    
+    @property
+    def multicall3(self):
+        if self._multicall3 is None:
+            self._multicall3 = self.web3.eth.contract(address=settings.MULTICALL3_ADDRESS, abi=_MULTICALL3_ABI)
+        return self._multicall3
     
     def _setup_admin_account(self):
         """設置管理員帳戶"""
@@ -78,11 +248,11 @@ class BlockchainService:
         if private_key:
             try:
                 self.admin_account = Account.from_key(private_key)
-                print(f"Admin account set up: {self.admin_account.address}")
-            except Exception as e:
-                print(f"Error setting up admin account: {e}")
+                logger.info("Admin account set up: %s", self.admin_account.address)
+            except Exception:
+                logger.exception("Error setting up admin account")
         else:
-            print("No admin private key provided, admin operations will not be available")
+            logger.info("No admin private key provided, admin operations will not be available")
     
     def _setup_ipfs_client(self):
         """設置 IPFS 客戶端"""
@@ -91,138 +261,293 @@ class BlockchainService:
             if settings.IPFS_PROJECT_ID and settings.IPFS_PROJECT_SECRET:
                 auth = (settings.IPFS_PROJECT_ID, settings.IPFS_PROJECT_SECRET)
                 self.ipfs_client = None  # 使用自定義請求而不是客戶端庫
-                print("Using IPFS with Infura credentials")
+                logger.info("Using IPFS with Infura credentials")
             else:
                 try:
                     self.ipfs_client = ipfshttpclient.connect(settings.IPFS_API)
-                    print("IPFS client connected")
-                except Exception as e:
-                    print(f"Error connecting to IPFS: {e}")
+                    logger.info("IPFS client connected")
+                except Exception:
+                    logger.exception("Error connecting to IPFS")
                     self.ipfs_client = None
-        except Exception as e:
-            print(f"Error setting up IPFS client: {e}")
+        except Exception:
+            logger.exception("Error setting up IPFS client")
             self.ipfs_client = None
     
+    async def _get_ipfs_client(self):
+        """首次上傳時才設置 IPFS 客戶端 (連接為阻塞操作，放到線程中執行)"""
+        if not self._ipfs_ready:
+            if self._ipfs_lock is None:
+                self._ipfs_lock = asyncio.Lock()
+            # 並發的首次上傳只進行一次連接
+            async with self._ipfs_lock:
+                if not self._ipfs_ready:
+                    await asyncio.to_thread(self._setup_ipfs_client)
+                    self._ipfs_ready = True
+        return self.ipfs_client
+    
     # 合約讀取函數
     
     async def get_property_count(self) -> int:
-        """獲取物業總數"""
+        """獲取物業總數 (帶快取)"""
+        count = self._property_count_cache.get("count")
+        if count is not None:
+            return count
         try:
-            count = await self.rental_nft.functions.getPropertyCount().call()
+            count = await self._call(self._rental_nft_call("getPropertyCount"))
+            self._property_count_cache["count"] = count
             return count
-        except Exception as e:
-            print(f"Error getting property count: {e}")
+        except Exception:
+            logger.exception("Error getting property count")
             return 0
     
     async def get_property(self, property_id: int) -> Dict[str, Any]:
         """獲取物業詳情"""
+        cached = self._property_cache.get(property_id)
+        if cached is not None:
+            return cached
+        property_info = await self.get_property_onchain(property_id)
+        if property_info:
+            await self.attach_metadata([property_info])
+            self._property_cache[property_id] = property_info
+        return property_info
+    
+    async def get_property_onchain(self, property_id: int) -> Dict[str, Any]:
+        """獲取物業的鏈上數據 (不含IPFS元數據)"""
         try:
-            property_data = await self.rental_nft.functions.properties(property_id).call()
-            
-            # 獲取物業元數據
-            metadata = await self._get_property_metadata(property_data[8])  # metadataURI
-            
-            return {
-                "id": property_id,
-                "owner": property_data[0],
-                "location": property_data[1],
-                "pricePerMonth": self.web3.fromWei(property_data[2], 'ether'),
-                "minRentalDuration": property_data[3],
-                "maxRentalDuration": property_data[4],
-                "available": property_data[5],
-                "pricingModel": property_data[6],
-                "depositRequirement": property_data[7],
-                "metadataURI": property_data[8],
-                "metadata": metadata
-            }
-        except Exception as e:
-            print(f"Error getting property {property_id}: {e}")
+            async with self._rpc_semaphore:
+                property_data = await self._call(self._rental_nft_call("properties", property_id))
+            return self._build_property(property_id, property_data)
+        except Exception:
+            logger.exception("Error getting property %s", property_id)
             return {}
     
-    async def get_available_properties(self, skip: int = 0, limit: int = 20) -> List[Dict[str, Any]]:
-        """獲取可用物業列表"""
+    async def attach_metadata(self, properties: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """並發獲取一批物業的IPFS元數據並寫入 "metadata" (相同URI只請求一次)"""
+        uris = list({p["metadataURI"] for p in properties})
+        metadata = await asyncio.gather(*(self._get_property_metadata(uri) for uri in uris))
+        metadata_by_uri = dict(zip(uris, metadata))
+        for p in properties:
+            p["metadata"] = metadata_by_uri[p["metadataURI"]]
+        return properties
+    
+    def _build_property(self, property_id: int, property_data) -> Dict[str, Any]:
+        """將合約返回的物業結構轉換為字典 (元數據由 attach_metadata 填入)"""
+        return {
+            "id": property_id,
+            "owner": property_data[0],
+            "location": property_data[1],
+            "_location_lc": property_data[1].lower(),  # 供位置過濾使用，不對外輸出
+            "pricePerMonth": property_data[2] / _WEI,
+            "minRentalDuration": property_data[3],
+            "maxRentalDuration": property_data[4],
+            "available": property_data[5],
+            "pricingModel": property_data[6],
+            "depositRequirement": property_data[7],
+            "metadataURI": property_data[8],
+            "metadata": {}
+        }
+    
+    async def get_available_properties(
+        self,
+        skip: int = 0,
+        limit: int = 20,
+        location: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_duration: Optional[int] = None,
+        max_duration: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """獲取可用物業列表 (先過濾再分頁，只讀取填滿當前頁所需的物業)"""
         try:
-            property_count = await self.get_property_count()
-            properties = []
+            predicates = self._build_property_predicates(
+                location, min_price, max_price, min_duration, max_duration
+            )
+            
+            # 合約沒有按條件分頁的查詢，按窗口分批讀取並過濾，收集滿 skip + limit 項即停止；
+            # 窗口大小為 limit 的倍數，以抵消不可用或不符合條件的物業
+            window = max(limit, 1) * _OVERFETCH_FACTOR
+            matched: List[Dict[str, Any]] = []
+            next_id = 1
+            if self._multicall3_enabled and "count" not in self._property_count_cache:
+                # 物業總數未快取時，與第一個窗口在同一個 multicall 中讀取
+                property_count, properties = await self._get_count_and_properties(
+                    list(range(1, window + 1))
+                )
+                matched.extend(p for p in properties if all(pred(p) for pred in predicates))
+                next_id = window + 1
+            else:
+                property_count = await self.get_property_count()
             
-            for i in range(1, property_count + 1):
-                property_data = await self.get_property(i)
-                if property_data and property_data.get("available", False):
-                    properties.append(property_data)
+            while next_id <= property_count and len(matched) < skip + limit:
+                end_id = min(next_id + window, property_count + 1)
+                properties = await self.get_properties_batch(list(range(next_id, end_id)))
+                matched.extend(p for p in properties if all(pred(p) for pred in predicates))
+                next_id = end_id
             
             # 分頁
-            return properties[skip:skip + limit]
-        except Exception as e:
-            print(f"Error getting available properties: {e}")
+            return matched[skip:skip + limit]
+        except Exception:
+            logger.exception("Error getting available properties")
             return []
     
+    async def get_properties_batch(self, property_ids: List[int]) -> List[Dict[str, Any]]:
+        """批量獲取物業詳情 (優先使用快取，忽略讀取失敗的物業)"""
+        return await self._read_through_cache(self._property_cache, property_ids, self._fetch_properties)
+    
+    async def get_rentals_batch(self, rental_ids: List[int]) -> List[Dict[str, Any]]:
+        """批量獲取租約詳情 (優先使用快取，忽略讀取失敗的租約)"""
+        return await self._read_through_cache(self._rental_cache, rental_ids, self._fetch_rentals)
+    
+    def invalidate_property(self, property_id: int):
+        """移除快取中的物業 (物業狀態變更後調用)"""
+        self._property_cache.pop(property_id, None)
+    
+    async def _fetch_properties(self, property_ids: List[int]) -> List[Dict[str, Any]]:
+        """從鏈上批量讀取物業"""
+        if not self._batch_reads_enabled:
+            properties = await self._read_concurrently(self.get_property_onchain, property_ids)
+            return await self.attach_metadata(properties)
+        
+        raw_results = await self._batch_call(
+            [self._rental_nft_call("properties", i) for i in property_ids]
+        )
+        return await self._build_properties(property_ids, raw_results)
+    
+    async def _fetch_rentals(self, rental_ids: List[int]) -> List[Dict[str, Any]]:
+        """從鏈上批量讀取租約"""
+        if not self._batch_reads_enabled:
+            return await self._read_concurrently(self.get_rental, rental_ids)
+        
+        raw_results = await self._batch_call(
+            [self._rental_nft_call("rentalRecords", i) for i in rental_ids]
+        )
+        return [
+            self._build_rental(rental_id, rental_data)
+            for rental_id, rental_data in zip(rental_ids, raw_results)
+            if rental_data is not None
+        ]
+    
+    async def _get_count_and_properties(self, property_ids: List[int]) -> Tuple[int, List[Dict[str, Any]]]:
+        """在同一個 multicall 中讀取物業總數及指定物業，返回 (總數, 存在的物業)"""
+        raw_results = await self.multicall(
+            [self._rental_nft_call("getPropertyCount")]
+            + [self._rental_nft_call("properties", i) for i in property_ids]
+        )
+        property_count = raw_results[0] or 0
+        if raw_results[0] is not None:
+            self._property_count_cache["count"] = property_count
+        # 超出總數的ID在合約中為空結構，直接丟棄
+        existing = [
+            (property_id, property_data)
+            for property_id, property_data in zip(property_ids, raw_results[1:])
+            if property_id <= property_count
+        ]
+        properties = await self._build_properties(
+            [property_id for property_id, _ in existing],
+            [property_data for _, property_data in existing],
+        )
+        for property_info in properties:
+            self._property_cache[property_info["id"]] = property_info
+        return property_count, properties
+    
+    async def _build_properties(self, property_ids: List[int], raw_results: List[Any]) -> List[Dict[str, Any]]:
+        """構建多個物業字典並批量填入元數據 (跳過讀取失敗的物業)"""
+        properties = [
+            self._build_property(property_id, property_data)
+            for property_id, property_data in zip(property_ids, raw_results)
+            if property_data is not None
+        ]
+        return await self.attach_metadata(properties)
+    
     async def get_rental(self, rental_id: int) -> Dict[str, Any]:
         """獲取租約詳情"""
+        cached = self._rental_cache.get(rental_id)
+        if cached is not None:
+            return cached
         try:
-            rental_data = await self.rental_nft.functions.rentalRecords(rental_id).call()
+            async with self._rpc_semaphore:
+                rental_data = await self._call(self._rental_nft_call("rentalRecords", rental_id))
             
-            return {
-                "id": rental_id,
-                "propertyId": rental_data[0],
-                "landlord": rental_data[1],
-                "tenant": rental_data[2],
-                "startDate": rental_data[3],
-                "endDate": rental_data[4],
-                "basePrice": self.web3.fromWei(rental_data[5], 'ether'),
-                "finalPrice": self.web3.fromWei(rental_data[6], 'ether'),
-                "deposit": self.web3.fromWei(rental_data[7], 'ether'),
-                "discountA": self.web3.fromWei(rental_data[8], 'ether'),
-                "discountBBase": self.web3.fromWei(rental_data[9], 'ether'),
-                "discountBPlus": self.web3.fromWei(rental_data[10], 'ether'),
-                "state": rental_data[11],
-                "allowTransfer": rental_data[12],
-                "cancelDeadline": rental_data[13],
-                "metadataURI": rental_data[14]
-            }
-        except Exception as e:
-            print(f"Error getting rental {rental_id}: {e}")
+            rental_info = self._build_rental(rental_id, rental_data)
+            self._rental_cache[rental_id] = rental_info
+            return rental_info
+        except Exception:
+            logger.exception("Error getting rental %s", rental_id)
             return {}
     
+    def _build_rental(self, rental_id: int, rental_data) -> Dict[str, Any]:
+        """將合約返回的租約結構轉換為字典"""
+        return {
+            "id": rental_id,
+            "propertyId": rental_data[0],
+            "landlord": rental_data[1],
+            "tenant": rental_data[2],
+            "startDate": rental_data[3],
+            "endDate": rental_data[4],
+            "basePrice": rental_data[5] / _WEI,
+            "finalPrice": rental_data[6] / _WEI,
+            "deposit": rental_data[7] / _WEI,
+            "discountA": rental_data[8] / _WEI,
+            "discountBBase": rental_data[9] / _WEI,
+            "discountBPlus": rental_data[10] / _WEI,
+            "state": rental_data[11],
+            "allowTransfer": rental_data[12],
+            "cancelDeadline": rental_data[13],
+            "metadataURI": rental_data[14]
+        }
+    
     async def get_user_rentals(self, user_address: str) -> List[Dict[str, Any]]:
         """獲取用戶的租約列表"""
         try:
-            rental_ids = await self.rental_nft.functions.getTenantRentals(user_address).call()
-            rentals = []
-            
-            for rental_id in rental_ids:
-                rental_data = await self.get_rental(rental_id)
-                if rental_data:
-                    rentals.append(rental_data)
-            
-            return rentals
-        except Exception as e:
-            print(f"Error getting user rentals for {user_address}: {e}")
+            rental_ids = await self._call(self._rental_nft_call("getTenantRentals", user_address))
+            return await self.get_rentals_batch(rental_ids)
+        except Exception:
+            logger.exception("Error getting user rentals for %s", user_address)
             return []
     
     async def get_landlord_properties(self, landlord_address: str) -> List[Dict[str, Any]]:
         """獲取房東的物業列表"""
         try:
-            property_ids = await self.rental_nft.functions.getLandlordProperties(landlord_address).call()
-            properties = []
-            
-            for property_id in property_ids:
-                property_data = await self.get_property(property_id)
-                if property_data:
-                    properties.append(property_data)
-            
-            return properties
-        except Exception as e:
-            print(f"Error getting landlord properties for {landlord_address}: {e}")
+            property_ids = await self._call(self._rental_nft_call("getLandlordProperties", landlord_address))
+            return await self.get_properties_batch(property_ids)
+        except Exception:
+            logger.exception("Error getting landlord properties for %s", landlord_address)
             return []
     
     async def calculate_rental_price(
         self, property_id: int, start_timestamp: int, end_timestamp: int, advance_booking_days: int
     ) -> Dict[str, Any]:
-        """計算租約價格"""
+        """計算租約價格 (帶快取，相同參數的並發請求只查詢一次合約)"""
+        # 提前預訂天數已按天取整，且直接決定折扣檔位，因此必須作為快取鍵的一部分
+        key = (property_id, start_timestamp, end_timestamp, advance_booking_days)
+        price_calc = self._price_cache.get(key)
+        if price_calc is not None:
+            return price_calc
+        
+        # 相同參數的並發請求共用同一個查詢任務，任務完成後才移除
+        task = self._price_tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_cache_price(key))
+            self._price_tasks[key] = task
+            task.add_done_callback(lambda _: self._price_tasks.pop(key, None))
+        # shield：單個請求被取消時不影響其他等待同一查詢的請求
+        return await asyncio.shield(task)
+    
+    async def _fetch_and_cache_price(self, key: Tuple[int, int, int, int]) -> Dict[str, Any]:
+        """查詢租約價格，成功時寫入快取"""
+        price_calc = await self._fetch_rental_price(*key)
+        if price_calc:
+            self._price_cache[key] = price_calc
+        return price_calc
+    
+    async def _fetch_rental_price(
+        self, property_id: int, start_timestamp: int, end_timestamp: int, advance_booking_days: int
+    ) -> Dict[str, Any]:
+        """從合約查詢租約價格"""
         try:
-            result = await self.rental_nft.functions.calculateRentalPrice(
-                property_id, start_timestamp, end_timestamp, advance_booking_days
-            ).call()
+            result = await self._call(self._rental_nft_call(
+                "calculateRentalPrice", property_id, start_timestamp, end_timestamp, advance_booking_days
+            ))
             
             base_price, discount_a, final_price = result
             
@@ -231,16 +556,16 @@ class BlockchainService:
             total_payment = final_price + platform_fee
             
             return {
-                "basePrice": self.web3.fromWei(base_price, 'ether'),
-                "discountA": self.web3.fromWei(discount_a, 'ether'),
-                "finalPrice": self.web3.fromWei(final_price, 'ether'),
-                "platformFee": self.web3.fromWei(platform_fee, 'ether'),
-                "totalPayment": self.web3.fromWei(total_payment, 'ether'),
+                "basePrice": base_price / _WEI,
+                "discountA": discount_a / _WEI,
+                "finalPrice": final_price / _WEI,
+                "platformFee": platform_fee / _WEI,
+                "totalPayment": total_payment / _WEI,
                 # 估計DeFi收益 (簡化版，實際應調用DeFi合約)
-                "estimatedDiscountB": float(self.web3.fromWei(base_price, 'ether')) * 0.04 * 0.7
+                "estimatedDiscountB": base_price / _WEI * 0.04 * 0.7
             }
-        except Exception as e:
-            print(f"Error calculating rental price: {e}")
+        except Exception:
+            logger.exception("Error calculating rental price")
             return {}
     
     # 合約寫入函數 (需要管理員帳戶或代表用戶簽名)
@@ -262,7 +587,7 @@ class BlockchainService:
                 metadata_uri = await self._upload_to_ipfs(property_data["metadata"])
             
             # 準備交易數據
-            price_in_wei = self.web3.toWei(property_data["pricePerMonth"], 'ether')
+            price_in_wei = self.web3.to_wei(property_data["pricePerMonth"], 'ether')
             
             function_call = self.rental_nft.functions.listProperty(
                 property_data["location"],
@@ -277,18 +602,25 @@ class BlockchainService:
             tx_hash = await self._build_and_send_tx(function_call, owner_address, private_key)
             
             # 等待交易收據
-            tx_receipt = self.web3.eth.waitForTransactionReceipt(tx_hash)
+            tx_receipt = await self.web3.eth.wait_for_transaction_receipt(tx_hash)
             
-            # 解析事件獲取物業ID
+            # 解析事件獲取物業ID (先按 topic0 過濾，只解碼PropertyListed事件)
             property_id = 0
+            topic, event_abi = self._property_listed_event
             for log in tx_receipt.logs:
-                try:
-                    # 嘗試解析PropertyListed事件
-                    event = self.rental_nft.events.PropertyListed().processLog(log)
+                if log['topics'] and log['topics'][0] == topic:
+                    event = get_event_data(self.web3.codec, event_abi, log)
                     property_id = event['args']['propertyId']
                     break
-                except:
-                    continue
+            
+            if property_id:
+                # 上架前讀取該ID時快取的是空結構，需移除
+                self.invalidate_property(property_id)
+                # 物業ID從1連續遞增，只提高已快取的總數；
+                # 快取已過期時保持為空，由下次讀取從鏈上獲取 (期間可能有其他物業上架)
+                count = self._property_count_cache.get("count")
+                if count is not None:
+                    self._property_count_cache["count"] = max(count, property_id)
             
             return {
                 "success": True,
@@ -299,11 +631,231 @@ class BlockchainService:
                 }
             }
         except Exception as e:
-            print(f"Error listing property: {e}")
+            logger.exception("Error listing property")
             return {"success": False, "error": str(e)}
     
     # 輔助函數
     
+    @staticmethod
+    def _build_property_predicates(
+        location: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_duration: Optional[int] = None,
+        max_duration: Optional[int] = None,
+    ) -> List[Callable[[Dict[str, Any]], bool]]:
+        """根據查詢參數構建物業過濾條件列表 (未提供的參數不產生條件)"""
+        predicates: List[Callable[[Dict[str, Any]], bool]] = [lambda p: p.get("available", False)]
+        if location:
+            location_lc = location.lower()
+            predicates.append(lambda p: location_lc in p["_location_lc"])
+        if min_price is not None:
+            predicates.append(lambda p: p["pricePerMonth"] >= min_price)
+        if max_price is not None:
+            predicates.append(lambda p: p["pricePerMonth"] <= max_price)
+        if min_duration is not None:
+            predicates.append(lambda p: p["minRentalDuration"] >= min_duration)
+        if max_duration is not None:
+            predicates.append(lambda p: p["maxRentalDuration"] <= max_duration)
+        return predicates
+    
+    @property
+    def _http(self) -> aiohttp.ClientSession:
+        """共用的異步 HTTP 會話，重用 TCP/TLS 連接"""
+        if self._http_client is None or self._http_client.closed:
+            self._http_client = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=settings.IPFS_REQUEST_TIMEOUT),
+                connector=aiohttp.TCPConnector(
+                    limit=settings.WEB3_POOL_MAXSIZE,
+                    limit_per_host=settings.WEB3_POOL_CONNECTIONS,
+                    keepalive_timeout=60,
+                ),
+            )
+        return self._http_client
+    
+    async def start(self):
+        """讓 Web3 提供者共用同一個 HTTP 會話 (RPC 與 IPFS 請求共用連接池)，並檢查 Multicall3 是否已部署"""
+        await self.web3.provider.cache_async_session(self._http)
+        if settings.MULTICALL3_ADDRESS:
+            try:
+                code = await self.web3.eth.get_code(settings.MULTICALL3_ADDRESS)
+            except Exception:
+                logger.warning("Could not check Multicall3 deployment", exc_info=True)
+            else:
+                if not code:
+                    self._disable_multicall3()
+    
+    async def close(self):
+        """關閉共用的 HTTP 會話"""
+        if self._http_client is not None and not self._http_client.closed:
+            await self._http_client.close()
+    
+    @property
+    def _rpc_semaphore(self) -> asyncio.Semaphore:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(settings.RPC_CONCURRENCY)
+        return self._sem
+    
+    async def _read_through_cache(self, cache: TTLCache, ids: List[int], fetch_missing) -> List[Dict[str, Any]]:
+        """只從鏈上讀取快取中沒有的ID，結果寫入快取並按原順序返回"""
+        found = {i: cache.get(i) for i in ids}
+        missing = [i for i, item in found.items() if item is None]
+        if missing:
+            for item in await fetch_missing(missing):
+                cache[item["id"]] = item
+                found[item["id"]] = item
+        return [found[i] for i in ids if found.get(i)]
+    
+    async def _read_concurrently(self, fetch, ids: List[int]) -> List[Dict[str, Any]]:
+        """並發讀取所有ID (並發數由 RPC_CONCURRENCY 信號量限制)，保持原順序並忽略失敗項"""
+        results = await asyncio.gather(*(fetch(i) for i in ids), return_exceptions=True)
+        return [item for item in results if item and not isinstance(item, BaseException)]
+    
+    @property
+    def _multicall3_enabled(self) -> bool:
+        return bool(settings.MULTICALL3_ADDRESS) and not self._multicall3_missing
+    
+    def _disable_multicall3(self):
+        """配置地址上沒有 Multicall3 合約，之後的批量讀取不再嘗試"""
+        if not self._multicall3_missing:
+            self._multicall3_missing = True
+            logger.warning(
+                "No Multicall3 contract at %s, using direct eth_call for batched reads",
+                settings.MULTICALL3_ADDRESS,
+            )
+    
+    @property
+    def _batch_reads_enabled(self) -> bool:
+        return self._multicall3_enabled or settings.RPC_BATCH_REQUESTS
+    
+    async def _batch_call(self, function_calls: List[_EncodedCall]) -> List[Any]:
+        """批量執行多個合約讀取 (優先使用 Multicall3，否則使用 JSON-RPC 批量請求)；
+        返回值順序與輸入一致，失敗的調用返回 None"""
+        if self._multicall3_enabled:
+            return await self.multicall(function_calls)
+        return await self._rpc_batch(function_calls)
+    
+    async def _rpc_batch(self, function_calls: List[_EncodedCall]) -> List[Any]:
+        """不經 Multicall3 執行多個合約讀取 (JSON-RPC 批量請求，停用時逐個並發調用)"""
+        if not settings.RPC_BATCH_REQUESTS:
+            return await self._call_each(function_calls)
+        
+        batch_size = max(settings.RPC_BATCH_SIZE, 1)
+        chunks = [function_calls[i:i + batch_size] for i in range(0, len(function_calls), batch_size)]
+        results = await asyncio.gather(*(self._post_batch(chunk) for chunk in chunks))
+        return [value for chunk_result in results for value in chunk_result]
+    
+    async def multicall(self, function_calls: List[_EncodedCall]) -> List[Any]:
+        """通過 Multicall3 aggregate3 在單個 eth_call 中執行多個合約讀取；
+        每次最多 MULTICALL3_BATCH_SIZE 個調用，失敗的調用返回 None"""
+        if not self._multicall3_enabled:
+            return await self._rpc_batch(function_calls)
+        batch_size = max(settings.MULTICALL3_BATCH_SIZE, 1)
+        chunks = [function_calls[i:i + batch_size] for i in range(0, len(function_calls), batch_size)]
+        results = await asyncio.gather(*(self._aggregate3(chunk) for chunk in chunks))
+        return [value for chunk_result in results for value in chunk_result]
+    
+    async def _aggregate3(self, function_calls: List[_EncodedCall]) -> List[Any]:
+        """執行單次 aggregate3 調用並解碼每個子調用的返回值"""
+        calls = [(call.address, True, call.data) for call in function_calls]
+        try:
+            async with self._rpc_semaphore:
+                replies = await self.multicall3.functions.aggregate3(calls).call()
+        except BadFunctionCallOutput:
+            # 配置地址沒有合約代碼 (如本地鏈上沒有部署 Multicall3)
+            self._disable_multicall3()
+            return await self._rpc_batch(function_calls)
+        except Exception:
+            # 瞬時錯誤：本批改用不依賴 Multicall3 的讀取方式，之後仍會嘗試 Multicall3
+            logger.warning(
+                "Multicall3 aggregate3 failed, falling back to direct eth_call",
+                exc_info=not self._multicall3_failed_before,
+            )
+            self._multicall3_failed_before = True
+            return await self._rpc_batch(function_calls)
+        
+        results = []
+        for call, (success, return_data) in zip(function_calls, replies):
+            if not success:
+                logger.warning("Error in multicall call %s", call.fn_name)
+                results.append(None)
+                continue
+            results.append(self._decode_call_result(call, return_data))
+        return results
+    
+    async def _call_each(self, function_calls: List[_EncodedCall]) -> List[Any]:
+        """並發逐個執行合約讀取 (並發數由 RPC_CONCURRENCY 信號量限制)，失敗的調用返回 None"""
+        async def call_one(call: _EncodedCall) -> Any:
+            try:
+                async with self._rpc_semaphore:
+                    return await self._call(call)
+            except Exception:
+                logger.exception("Error calling %s", call.fn_name)
+                return None
+        
+        return list(await asyncio.gather(*(call_one(call) for call in function_calls)))
+    
+    async def _post_batch(self, function_calls: List[_EncodedCall]) -> List[Any]:
+        """發送單個 JSON-RPC 批量 eth_call 請求並解碼結果"""
+        payload = [
+            {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "method": "eth_call",
+                "params": [{"to": call.address, "data": "0x" + call.data.hex()}, "latest"],
+            }
+            for request_id, call in enumerate(function_calls)
+        ]
+        try:
+            async with self._rpc_semaphore:
+                async with self._http.post(
+                    settings.BLOCKCHAIN_PROVIDER,
+                    data=orjson.dumps(payload),
+                    headers={"Content-Type": "application/json"},
+                    timeout=aiohttp.ClientTimeout(total=settings.WEB3_REQUEST_TIMEOUT),
+                ) as response:
+                    response.raise_for_status()
+                    replies = {reply["id"]: reply for reply in orjson.loads(await response.read())}
+        except Exception:
+            logger.exception("Error sending JSON-RPC batch")
+            return [None] * len(function_calls)
+        
+        results = []
+        for request_id, call in enumerate(function_calls):
+            reply = replies.get(request_id, {})
+            if "result" not in reply:
+                logger.warning("Error in JSON-RPC batch call %s: %s", call.fn_name, reply.get("error"))
+                results.append(None)
+                continue
+            results.append(self._decode_call_result(call, HexBytes(reply["result"])))
+        return results
+    
+    def _rental_nft_call(self, fn_name: str, *args) -> _EncodedCall:
+        """使用預先計算的選擇器編碼 RentalNFT 合約讀取調用"""
+        selector, input_types, output_types = _function_codec("RentalNFT", fn_name)
+        return _EncodedCall(
+            self.rental_nft.address, fn_name, selector + self.web3.codec.encode(input_types, args), output_types
+        )
+    
+    async def _call(self, call: _EncodedCall) -> Any:
+        """執行單個已編碼的合約讀取 (eth_call) 並解碼結果"""
+        return_data = await self.web3.eth.call({"to": call.address, "data": "0x" + call.data.hex()})
+        return self._decode_output(call.output_types, return_data)
+    
+    def _decode_output(self, output_types: Tuple[str, ...], return_data: bytes) -> Any:
+        """按輸出類型解碼返回數據"""
+        # 與 ContractFunction.call() 一致：地址轉為校驗和格式，單一返回值時不包裝為元組
+        values = map_abi_data(BASE_RETURN_NORMALIZERS, output_types, self.web3.codec.decode(output_types, return_data))
+        return values[0] if len(values) == 1 else values
+    
+    def _decode_call_result(self, call: _EncodedCall, return_data: bytes) -> Any:
+        """解碼批量調用中單個調用的返回數據，解碼失敗返回 None"""
+        try:
+            return self._decode_output(call.output_types, return_data)
+        except Exception:
+            logger.exception("Error decoding result of %s", call.fn_name)
+            return None
+    
     async def _get_property_metadata(self, metadata_uri: str) -> Dict[str, Any]:
         """從IPFS獲取物業元數據"""
         try:
@@ -317,67 +869,144 @@ class BlockchainService:
             
             # 從IPFS獲取數據
             ipfs_hash = metadata_uri.replace("ipfs://", "")
-            response = requests.get(f"{settings.IPFS_GATEWAY}{ipfs_hash}")
+            metadata = self._metadata_cache.get(ipfs_hash)
+            if metadata is not None:
+                return metadata
             
-            if response.status_code == 200:
-                return response.json()
-            else:
-                print(f"Error fetching metadata from IPFS: {response.status_code}")
-                return {}
-        except Exception as e:
-            print(f"Error getting property metadata: {e}")
+            async with self._http.get(f"{settings.IPFS_GATEWAY}{ipfs_hash}") as response:
+                if response.status == 200:
+                    metadata = orjson.loads(await response.read())
+                    # 只快取成功的結果，失敗時下次重試
+                    self._metadata_cache[ipfs_hash] = metadata
+                    return metadata
+                else:
+                    logger.warning("Error fetching metadata from IPFS: %s", response.status)
+                    return {}
+        except Exception:
+            logger.exception("Error getting property metadata")
             return {}
     
     async def _upload_to_ipfs(self, data: Dict[str, Any]) -> str:
         """上傳數據到IPFS"""
         try:
-            if self.ipfs_client is None:
+            ipfs_client = await self._get_ipfs_client()
+            if ipfs_client is None:
                 # 使用 Infura IPFS API
                 if settings.IPFS_PROJECT_ID and settings.IPFS_PROJECT_SECRET:
-                    auth = (settings.IPFS_PROJECT_ID, settings.IPFS_PROJECT_SECRET)
-                    response = requests.post(
-                        f"{settings.IPFS_API}/add",
-                        files={"file": json.dumps(data)},
-                        auth=auth
-                    )
-                    if response.status_code == 200:
-                        ipfs_hash = response.json()["Hash"]
-                        return f"ipfs://{ipfs_hash}"
-                    else:
-                        print(f"Error uploading to Infura IPFS: {response.status_code}")
-                        return ""
+                    auth = aiohttp.BasicAuth(settings.IPFS_PROJECT_ID, settings.IPFS_PROJECT_SECRET)
+                    form = aiohttp.FormData()
+                    form.add_field("file", orjson.dumps(data))
+                    async with self._http.post(f"{settings.IPFS_API}/add", data=form, auth=auth) as response:
+                        if response.status == 200:
+                            ipfs_hash = orjson.loads(await response.read())["Hash"]
+                            return f"ipfs://{ipfs_hash}"
+                        else:
+                            logger.warning("Error uploading to Infura IPFS: %s", response.status)
+                            return ""
                 else:
-                    print("No IPFS client available")
+                    logger.warning("No IPFS client available")
                     return ""
             else:
-                # 使用本地IPFS客戶端
-                result = self.ipfs_client.add_json(data)
+                # 使用本地IPFS客戶端 (同步庫，放到線程中執行)
+                result = await asyncio.to_thread(ipfs_client.add_json, data)
                 return f"ipfs://{result}"
-        except Exception as e:
-            print(f"Error uploading to IPFS: {e}")
+        except Exception:
+            logger.exception("Error uploading to IPFS")
             return ""
     
     async def _build_and_send_tx(self, function_call, from_address: str, private_key: Optional[str] = None) -> bytes:
         """構建並發送交易"""
-        # 獲取nonce
-        nonce = self.web3.eth.getTransactionCount(from_address)
-        
-        # 構建交易
-        tx = function_call.buildTransaction({
-            'from': from_address,
-            'nonce': nonce,
-            'gas': 2000000,  # 預設gas限制
-            'gasPrice': self.web3.eth.gasPrice
-        })
-        
-        # 簽名交易
+        # 選擇簽名私鑰
         if private_key:
-            signed_tx = self.web3.eth.account.signTransaction(tx, private_key)
+            signing_key = private_key
         elif self.admin_account and from_address.lower() == self.admin_account.address.lower():
-            signed_tx = self.web3.eth.account.signTransaction(tx, self.admin_account.key)
+            signing_key = self.admin_account.key
         else:
             raise ValueError("No private key provided and admin account doesn't match from_address")
         
-        # 發送交易
-        tx_hash = self.web3.eth.sendRawTransaction(signed_tx.rawTransaction)
-        return tx_hash
\ No newline at end of file
+        # 獲取nonce
+        nonce = await self._next_nonce(from_address)
+        
+        try:
+            # 按估算值設置gas限制
+            gas = int(await function_call.estimate_gas({'from': from_address}) * _GAS_LIMIT_MULTIPLIER)
+            
+            # 構建交易 (明確指定 chainId，避免每次查詢)
+            tx = await function_call.build_transaction({
+                'from': from_address,
+                'nonce': nonce,
+                'chainId': await self._get_chain_id(),
+                'gas': gas,
+                **await self._get_fees()
+            })
+            
+            # 簽名交易
+            signed_tx = self.web3.eth.account.sign_transaction(tx, signing_key)
+            
+            # 發送交易
+            tx_hash = await self.web3.eth.send_raw_transaction(signed_tx.rawTransaction)
+        except Exception:
+            # 本地 nonce 可能已與鏈上不一致，下次重新同步
+            self._nonces.pop(from_address.lower(), None)
+            raise
+        return tx_hash
+    
+    @property
+    def _nonce_lock(self) -> asyncio.Lock:
+        if self._nonce_mutex is None:
+            self._nonce_mutex = asyncio.Lock()
+        return self._nonce_mutex
+    
+    async def _next_nonce(self, address: str) -> int:
+        """分配地址的下一個 nonce (首次從鏈上的 pending 狀態同步，之後本地遞增)"""
+        key = address.lower()
+        async with self._nonce_lock:
+            nonce = self._nonces.get(key)
+            if nonce is None:
+                nonce = await self.web3.eth.get_transaction_count(address, "pending")
+            self._nonces[key] = nonce + 1
+            return nonce
+    
+    async def _get_chain_id(self) -> int:
+        """獲取鏈ID (優先使用配置的 CHAIN_ID，否則只查詢一次)"""
+        if self._chain_id is None:
+            self._chain_id = await self.web3.eth.chain_id
+        return self._chain_id
+    
+    async def _get_fees(self) -> Dict[str, int]:
+        """獲取交易手續費參數 (快取一個區塊時間)；
+        支持 EIP-1559 的鏈使用 maxFeePerGas/maxPriorityFeePerGas，否則使用 gasPrice"""
+        fees = self._fee_cache.get("fees")
+        if fees is not None:
+            return fees
+        
+        history = await self.web3.eth.fee_history(5, 'latest', [25, 50, 75])
+        base_fee = history.get('baseFeePerGas', [0])[-1]  # 下一個區塊的基礎費用
+        if base_fee:
+            # 取最近區塊第50百分位小費的中位數
+            tips = sorted(reward[1] for reward in history.get('reward', []))
+            priority_fee = tips[len(tips) // 2] if tips else await self.web3.eth.max_priority_fee
+            fees = {
+                'maxFeePerGas': 2 * base_fee + priority_fee,
+                'maxPriorityFeePerGas': priority_fee,
+            }
+        else:
+            fees = {'gasPrice': await self.web3.eth.gas_price}
+        self._fee_cache["fees"] = fees
+        return fees
+
+@lru_cache(maxsize=1)
+def get_blockchain_service() -> BlockchainService:
+    """依賴項，獲取全局共用的區塊鏈服務實例 (首次請求時才創建)"""
+    return BlockchainService()
+
+
+async def start_blockchain_service():
+    """創建區塊鏈服務並綁定共用的 HTTP 會話 (應用啟動時調用)"""
+    await get_blockchain_service().start()
+
+
+async def close_blockchain_service():
+    """關閉已創建的區塊鏈服務 (應用關閉時調用)"""
+    if get_blockchain_service.cache_info().currsize:
+        await get_blockchain_service().close()